@@ -1,6 +1,14 @@
 import functools
+import sys
 from collections import Counter
 
+from persistent_cache import PersistentCache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 def digits(n):
     return len(str(n))
 
@@ -11,22 +19,82 @@ def blink(n):
     d = digits(n)
     if d & 1:
         return (n * 2024,)
-    return tuple(int(x) for x in divmod(n, 10**(d / 2)))
+    return divmod(n, 10 ** (d // 2))
 
-def update_counter(cr):
+def update_counter(cr, blink=blink):
     items = list(cr.items())
     for key, val in items:
         cr[key] -= val
         for result in blink(key):
             cr[result] += val
 
+if np is not None:
+    # POWERS[i] == 10 ** i, for every power that fits in a uint64
+    POWERS = np.array([10 ** i for i in range(20)], dtype=np.uint64)
+    LARGEST_ODD = np.uint64((2 ** 64 - 1) // 2024)
+
+def array_digits(values):
+    # 0 comes out as 0 digits, which is fine because it's handled separately
+    return np.searchsorted(POWERS, values, side='right')
+
+def to_arrays(cr):
+    values = np.fromiter(cr.keys(), dtype=np.uint64, count=len(cr))
+    counts = np.fromiter(cr.values(), dtype=np.int64, count=len(cr))
+    return values, counts
+
+def blink_arrays(values, counts):
+    """
+    update_counter for stones held as parallel value and count arrays. Every
+    stone is blinked at once, then equal values are merged.
+    """
+    zero = values == 0
+    d = array_digits(values)
+    even = (d & 1 == 0) & ~zero
+    odd = ~(zero | even)
+    if (values[odd] > LARGEST_ODD).any():
+        raise OverflowError('Stone too big to multiply by 2024 in a uint64')
+
+    half = POWERS[d[even] // 2]
+    blinked = np.concatenate([
+        np.ones(zero.sum(), dtype=np.uint64),
+        values[odd] * np.uint64(2024),
+        values[even] // half,
+        values[even] % half,
+    ])
+    blinked_counts = np.concatenate([counts[zero], counts[odd], counts[even], counts[even]])
+
+    values, inverse = np.unique(blinked, return_inverse=True)
+    counts = np.zeros(len(values), dtype=np.int64)
+    np.add.at(counts, inverse, blinked_counts)
+    return values, counts
+
 
 n = [int(x) for x in '814 1183689 0 1 766231 4091 93836 46'.split()]
-c = Counter(n)
-for _ in range(25):
-    update_counter(c)
-print(sum(c.values()))
-
-for _ in range(50):
-    update_counter(c)
-print(sum(c.values()))
+
+# Optional argument: a cache file to reuse blinks from earlier runs
+cache = PersistentCache(sys.argv[1]) if len(sys.argv) > 1 else None
+stone_blink = blink
+if cache is not None:
+    stone_blink = functools.partial(cache.blink, compute=blink)
+
+if np is not None and cache is None:
+    values, counts = to_arrays(Counter(n))
+    for _ in range(25):
+        values, counts = blink_arrays(values, counts)
+    print(counts.sum())
+
+    for _ in range(50):
+        values, counts = blink_arrays(values, counts)
+    print(counts.sum())
+else:
+    c = Counter(n)
+    for _ in range(25):
+        update_counter(c, stone_blink)
+    print(sum(c.values()))
+
+    for _ in range(50):
+        update_counter(c, stone_blink)
+    print(sum(c.values()))
+
+if cache is not None:
+    cache.close()
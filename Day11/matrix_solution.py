@@ -0,0 +1,239 @@
+from collections import Counter
+from operator import mul
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from recursive_solution import blink
+
+# Below this, the sum of two residues still fits in an int64
+INT64_MODULUS = 2 ** 62
+
+def poly_mul(a, b, modulus):
+    """
+    Product of the polynomials a and b, as lists of coefficients from the
+    constant term up, modulo modulus. Both are packed into one big int with
+    a slot for each coefficient wide enough for any coefficient of the
+    product (Kronecker substitution), so all the work is a single int
+    multiplication.
+    """
+    if not a or not b:
+        return []
+    bits = 2 * (modulus - 1).bit_length() + min(len(a), len(b)).bit_length()
+    slot = bits // 8 + 1
+
+    def pack(poly):
+        return int.from_bytes(b''.join(c.to_bytes(slot, 'little') for c in poly), 'little')
+
+    product = (pack(a) * pack(b)).to_bytes(slot * (len(a) + len(b) - 1), 'little')
+    return [int.from_bytes(product[i:i + slot], 'little') % modulus
+            for i in range(0, len(product), slot)]
+
+def poly_inverse(f, n, modulus):
+    """
+    g with f * g = 1 modulo x ** n, by Newton's iteration, which doubles
+    the number of correct terms each round.
+    """
+    g = [pow(f[0], -1, modulus)]
+    size = 1
+    while size < n:
+        size = min(2 * size, n)
+        error = poly_mul(f[:size], g, modulus)[:size]
+        error += [0] * (size - len(error))
+        error = [-c % modulus for c in error]
+        error[0] = (error[0] + 2) % modulus
+        g = poly_mul(g, error, modulus)[:size]
+    return g
+
+def berlekamp_massey(sequence, modulus):
+    """
+    The shortest recurrence
+        sequence[n] + c[1] * sequence[n - 1] + ... + c[L] * sequence[n - L] = 0
+    modulo a prime modulus that the whole sequence obeys, as the list c
+    with c[0] = 1. Anything counted by an L-state linear system obeys one
+    with at most L terms, and its first 2L values are enough to find it.
+    """
+    c = [1]
+    b = [1]
+    length = 0
+    shift = 1
+    last = 1
+    for n, value in enumerate(sequence):
+        discrepancy = (value + sum(map(mul, c[1:length + 1], sequence[n - 1::-1]))) % modulus
+        if discrepancy == 0:
+            shift += 1
+            continue
+        scale = discrepancy * pow(last, -1, modulus) % modulus
+        previous = c
+        c = c + [0] * (len(b) + shift - len(c))
+        for i, x in enumerate(b):
+            c[i + shift] = (c[i + shift] - scale * x) % modulus
+        if 2 * length <= n:
+            length, b, last, shift = n + 1 - length, previous, discrepancy, 1
+        else:
+            shift += 1
+    return c[:length + 1] + [0] * (length + 1 - len(c))
+
+def recurrence_term(sequence, c, n, modulus):
+    """
+    sequence[n] for any n, given its first len(c) - 1 values and the
+    recurrence c from berlekamp_massey. This is the sum of those values
+    weighted by the coefficients of x ** n modulo the recurrence's
+    characteristic polynomial, which takes log(n) squarings. Each one is
+    reduced with a precomputed inverse of the reversed polynomial, so it
+    costs three poly_muls.
+    """
+    order = len(c) - 1
+    if n < len(sequence):
+        return sequence[n] % modulus
+    if order == 0:
+        return 0
+    # x ** order + c[1] * x ** (order - 1) + ... + c[order], constant term first
+    characteristic = c[::-1]
+    inverse = poly_inverse(c, max(order - 1, 1), modulus)
+
+    def reduce(a):
+        k = len(a) - order
+        if k <= 0:
+            return a + [0] * -k
+        reversed_quotient = poly_mul(a[:-k - 1:-1], inverse[:k], modulus)[:k]
+        reversed_quotient += [0] * (k - len(reversed_quotient))
+        product = poly_mul(reversed_quotient[::-1], characteristic, modulus)
+        return [(a[i] - product[i]) % modulus for i in range(order)]
+
+    power = reduce([1])
+    for bit in bin(n)[2:]:
+        power = reduce(poly_mul(power, power, modulus))
+        if bit == '1':
+            power = reduce([0] + power)
+    return sum(map(mul, power, sequence)) % modulus
+
+
+class TransitionMatrix:
+    """
+    Every stone value reachable from the seeds, numbered in the order they
+    were found, with the numbers of the stones each one splits into on a
+    blink. The set closes after a few thousand values, so the matrix stays
+    the same size however many blinks are asked for.
+    """
+    def __init__(self, seeds=()):
+        self.values = []
+        self.index = {}
+        self.children = []
+        self.extend(seeds)
+
+    def __repr__(self):
+        return f'TransitionMatrix({len(self)} values)'
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value):
+        if value not in self.index:
+            self.index[value] = len(self.values)
+            self.values.append(value)
+            self.children.append(None)
+        return self.index[value]
+
+    def extend(self, seeds):
+        """
+        Adds the seeds, and everything they can ever turn into, to the closure.
+        """
+        pending = [self.add(seed) for seed in seeds]
+        while pending:
+            i = pending.pop()
+            if self.children[i] is not None:
+                continue
+            self.children[i] = tuple(self.add(child) for child in blink(self.values[i]))
+            pending.extend(c for c in self.children[i] if self.children[c] is None)
+
+    def layers(self):
+        """
+        The matrix's entries as (parent, child) index arrays, split into
+        layers with no child twice in the same layer, so one blink can add
+        each layer's counts in with a single fancy-indexed add.
+        """
+        layers = []
+        seen = Counter()
+        for parent, children in enumerate(self.children):
+            for child in children:
+                k = seen[child]
+                seen[child] += 1
+                if k == len(layers):
+                    layers.append(([], []))
+                layers[k][0].append(parent)
+                layers[k][1].append(child)
+        return [(np.array(parents, dtype=np.intp), np.array(children, dtype=np.intp))
+                for parents, children in layers]
+
+    def count(self, seeds, blinks, modulus=None):
+        """
+        Number of stones after blinking blinks times, modulo modulus if
+        given, which must be prime.
+        """
+        self.extend(seeds)
+        counts = Counter(self.index[seed] for seed in seeds)
+        if modulus is None:
+            return self.step(counts, blinks)
+        totals = self.totals(counts, min(blinks + 1, 2 * len(self)), modulus)
+        if blinks < len(totals):
+            return totals[blinks]
+        return recurrence_term(totals, berlekamp_massey(totals, modulus), blinks, modulus)
+
+    def blink(self, counts, modulus=None):
+        stepped = Counter()
+        for i, n in counts.items():
+            for child in self.children[i]:
+                stepped[child] += n
+        if modulus is not None:
+            for i in stepped:
+                stepped[i] %= modulus
+        return stepped
+
+    def step(self, counts, blinks, modulus=None):
+        for _ in range(blinks):
+            counts = self.blink(counts, modulus)
+        total = sum(counts.values())
+        return total if modulus is None else total % modulus
+
+    def totals(self, counts, terms, modulus):
+        """
+        The number of stones modulo modulus after 0, 1, ..., terms - 1
+        blinks. With numpy each blink is one array pass per layer, keeping
+        every count below the modulus so the adds never overflow.
+        """
+        if np is None or modulus >= INT64_MODULUS:
+            totals = []
+            for blinks in range(terms):
+                totals.append(sum(counts.values()) % modulus)
+                if blinks < terms - 1:
+                    counts = self.blink(counts, modulus)
+            return totals
+
+        layers = self.layers()
+        vector = np.zeros(len(self), dtype=np.int64)
+        for i, n in counts.items():
+            vector[i] = n % modulus
+        totals = []
+        for blinks in range(terms):
+            # Added in 31-bit halves so the sums fit in an int64
+            high = int((vector >> 31).sum())
+            low = int((vector & (2 ** 31 - 1)).sum())
+            totals.append(((high << 31) + low) % modulus)
+            if blinks < terms - 1:
+                stepped = np.zeros_like(vector)
+                for parents, children in layers:
+                    stepped[children] = (stepped[children] + vector[parents]) % modulus
+                vector = stepped
+        return totals
+
+
+if __name__ == '__main__':
+    n = [int(x) for x in '814 1183689 0 1 766231 4091 93836 46'.split()]
+    matrix = TransitionMatrix(n)
+    print(matrix)
+    print(matrix.count(n, 25))
+    print(matrix.count(n, 75))
+    print(matrix.count(n, 10 ** 6, modulus=1_000_003))
@@ -0,0 +1,158 @@
+import heapq
+import mmap
+import os
+import struct
+
+# kind, number of children, value, then either both children or depth and count
+RECORD = struct.Struct('<BB6xQQQ')
+BLINK = 0
+COUNT = 1
+U64 = 2 ** 64
+
+def record_key(record):
+    kind, n, value, a, b = record
+    return (kind, value, a if kind == COUNT else 0)
+
+def sorted_prefix(records):
+    """
+    How many of the records, from the start, are in strictly ascending
+    record_key order.
+    """
+    count = 0
+    previous = None
+    for record in records:
+        key = record_key(record)
+        if previous is not None and key <= previous:
+            break
+        previous = key
+        count += 1
+    return count
+
+def unique(records):
+    """
+    The records of an iterable sorted by record_key, less any repeated keys.
+    """
+    previous = None
+    for record in records:
+        key = record_key(record)
+        if key != previous:
+            yield record
+        previous = key
+
+class PersistentCache:
+    """
+    blink transitions (value -> children) and (value, depth) -> count results
+    kept in a file of fixed-size binary records, so that later runs start
+    warm. The file is a run of records sorted by record_key followed by
+    whatever was appended since it was last sorted. Opening it merges the
+    two, and counts are then found by binary search through mmap. New
+    counts are appended to the file and also held in pending until there
+    are merge_every of them, when the file is merged again, so memory for
+    counts is bounded by merge_every however many the file holds.
+    Blinks are few (one per value in the closure) and are kept in a dict.
+    Anything that doesn't fit in a uint64 is only kept in memory, or not at
+    all for counts.
+    """
+    def __init__(self, path, merge_every=1 << 16):
+        self.path = path
+        self.merge_every = merge_every
+        self.children = {}
+        self.pending = {}
+        self.mm = None
+        self.length = 0
+        self.load()
+        self.fl = open(path, 'ab')
+
+    def __repr__(self):
+        return f'PersistentCache({self.path!r}, {len(self.children)} blinks, {self.length} records)'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.fl.close()
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+    def merge(self):
+        """
+        Sorts everything appended so far into the mapped part of the file.
+        """
+        self.close()
+        self.load()
+        self.fl = open(self.path, 'ab')
+        self.pending.clear()
+
+    def records(self, mm, start, stop):
+        for offset in range(start * RECORD.size, stop * RECORD.size, RECORD.size):
+            yield RECORD.unpack_from(mm, offset)
+
+    def load(self):
+        """
+        Sorts the records appended by earlier runs into the rest, rewriting
+        the file if there were any, maps it and reads in the blinks.
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb') as fl, mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # A run that died mid-write can leave a partial record at the end
+            total = len(mm) // RECORD.size
+            ordered = sorted_prefix(self.records(mm, 0, total))
+            if ordered < total or len(mm) % RECORD.size:
+                tail = sorted(self.records(mm, ordered, total), key=record_key)
+                merged = heapq.merge(self.records(mm, 0, ordered), tail, key=record_key)
+                with open(self.path + '.tmp', 'wb') as out:
+                    for record in unique(merged):
+                        out.write(RECORD.pack(*record))
+                os.replace(self.path + '.tmp', self.path)
+
+        with open(self.path, 'rb') as fl:
+            self.length = os.fstat(fl.fileno()).st_size // RECORD.size
+            if self.length:
+                self.mm = mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+        for kind, n, value, a, b in self.records(self.mm, 0, self.length):
+            if kind != BLINK:
+                break
+            if n in (1, 2):
+                self.children[value] = (a, b)[:n]
+
+    def find(self, key):
+        lo, hi = 0, self.length
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if record_key(RECORD.unpack_from(self.mm, mid * RECORD.size)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.length:
+            record = RECORD.unpack_from(self.mm, lo * RECORD.size)
+            if record_key(record) == key:
+                return record
+        return None
+
+    def blink(self, value, compute):
+        children = self.children.get(value)
+        if children is None:
+            children = compute(value)
+            self.children[value] = children
+            if value < U64 and max(children) < U64:
+                self.fl.write(RECORD.pack(BLINK, len(children), value, children[0], children[-1]))
+        return children
+
+    def get_count(self, value, depth):
+        count = self.pending.get((value, depth))
+        if count is not None or value >= U64:
+            return count
+        record = self.find((COUNT, value, depth))
+        return None if record is None else record[4]
+
+    def put_count(self, value, depth, count):
+        if value < U64 and count < U64:
+            self.fl.write(RECORD.pack(COUNT, 0, value, depth, count))
+            self.pending[(value, depth)] = count
+            if len(self.pending) >= self.merge_every:
+                self.merge()
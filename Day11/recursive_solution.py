@@ -1,4 +1,6 @@
-import functools
+from collections import OrderedDict
+
+from persistent_cache import PersistentCache
 
 def blink(n):
     if n == 0:
@@ -6,12 +8,102 @@ def blink(n):
     d = len(str(n))
     if d & 1:
         return (n * 2024,)
-    return tuple(int(x) for x in divmod(n, 10**(d / 2)))
+    return divmod(n, 10 ** (d // 2))
 
-@functools.cache
-def num(n, depth):
-    res = blink(n)
-    if depth == 0:
-        return 1
-    return sum(num(r, depth - 1) for r in res)
+class StoneCounter:
+    """
+    Iterative num() with an LRU memo of (stone, depth) -> count that holds at
+    most maxsize entries. One instance can answer any number of
+    (seed, depth) queries and they all share the memo.
+    With a PersistentCache as store, blinks and counts are also looked up
+    in, and saved to, the file behind it.
+    """
+    def __init__(self, maxsize=1 << 20, store=None):
+        self.maxsize = maxsize
+        self.store = store
+        self.memo = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (f'StoneCounter(size={len(self.memo)}, hits={self.hits}, '
+                f'misses={self.misses}, evictions={self.evictions})')
+
+    def get(self, key):
+        count = self.memo.get(key)
+        if count is None and self.store is not None:
+            count = self.store.get_count(*key)
+            if count is not None:
+                self.remember(key, count)
+        if count is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.memo.move_to_end(key)
+        return count
+
+    def put(self, key, count):
+        if self.store is not None:
+            self.store.put_count(*key, count)
+        self.remember(key, count)
+
+    def remember(self, key, count):
+        self.memo[key] = count
+        if len(self.memo) > self.maxsize:
+            self.memo.popitem(last=False)
+            self.evictions += 1
+
+    def blink(self, n):
+        if self.store is None:
+            return blink(n)
+        return self.store.blink(n, blink)
 
+    def count(self, n, depth):
+        """
+        Depth-first over an explicit stack, so depth isn't limited by the
+        recursion limit. Each frame adds up its own children, so the memo
+        only saves work and an evicted entry is never needed for the answer.
+        """
+        if depth < 0:
+            raise ValueError(f'Depth {depth} is negative')
+        if depth == 0:
+            return 1
+        cached = self.get((n, depth))
+        if cached is not None:
+            return cached
+
+        # frame: [stone, depth, remaining children, total so far]
+        stack = [[n, depth, iter(self.blink(n)), 0]]
+        while True:
+            frame = stack[-1]
+            child = next(frame[2], None)
+            if child is not None:
+                if frame[1] == 1:
+                    frame[3] += 1
+                    continue
+                cached = self.get((child, frame[1] - 1))
+                if cached is not None:
+                    frame[3] += cached
+                else:
+                    stack.append([child, frame[1] - 1, iter(self.blink(child)), 0])
+                continue
+
+            stack.pop()
+            self.put((frame[0], frame[1]), frame[3])
+            if not stack:
+                return frame[3]
+            stack[-1][3] += frame[3]
+
+counter = StoneCounter()
+
+def use_persistent_cache(path):
+    """
+    Opt in to keeping num()'s work in path, to reuse in later runs.
+    """
+    global counter
+    counter = StoneCounter(counter.maxsize, PersistentCache(path))
+    return counter.store
+
+def num(n, depth):
+    return counter.count(n, depth)
@@ -0,0 +1,461 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+
+class Grid:
+    """
+    The plot map as one flat bytearray, row after row, so cell (row, col)
+    is cells[row * width + col].
+    """
+    def __init__(self, cells, height, width):
+        self.cells = cells
+        self.height = height
+        self.width = width
+
+    def __repr__(self):
+        return f'Grid({self.height}x{self.width})'
+
+    def __str__(self):
+        return '\n'.join(self.cells[i:i + self.width].decode()
+                         for i in range(0, len(self.cells), self.width))
+
+
+class Region:
+    __slots__ = ('value', 'area', 'perimeter', 'sides')
+
+    def __init__(self, value, area=0, perimeter=0, sides=0):
+        self.value = value
+        self.area = area
+        self.perimeter = perimeter
+        self.sides = sides
+
+    def __repr__(self):
+        return (f'Region({chr(self.value)}, area={self.area}, '
+                f'perimeter={self.perimeter}, sides={self.sides})')
+
+    def price(self):
+        return self.area * self.perimeter
+
+    def discount_price(self):
+        return self.area * self.sides
+
+    def absorb(self, other):
+        self.area += other.area
+        self.perimeter += other.perimeter
+        self.sides += other.sides
+
+
+def read_grid(filename):
+    cells = bytearray()
+    height = 0
+    width = 0
+    with open(filename, 'rb') as f:
+        for line in f:
+            line = line.rstrip()
+            if not line:
+                continue
+            if height == 0:
+                width = len(line)
+            elif len(line) != width:
+                raise ValueError(f'Row {height} is {len(line)} wide, expected {width}')
+            cells += line
+            height += 1
+    return Grid(cells, height, width)
+
+def find(parent, label):
+    while parent[label] != label:
+        parent[label] = parent[parent[label]]
+        label = parent[label]
+    return label
+
+def cell_corners(above, row, below, col):
+    """
+    How many corners of its region's outline the cell at row[col] is on,
+    where above and below are the neighbouring rows, or None at the edges.
+    A polygon has as many sides as corners, so adding this up over a region
+    gives its sides. Each corner of the cell is convex when neither
+    neighbour next to it matches, and concave when both match but the
+    diagonal one doesn't.
+    """
+    value = row[col]
+    last = len(row) - 1
+    up = above is not None and above[col] == value
+    down = below is not None and below[col] == value
+    left = col > 0 and row[col - 1] == value
+    right = col < last and row[col + 1] == value
+
+    corners = 0
+    for vertical, horizontal, across, diagonal in ((up, left, above, col - 1),
+                                                   (up, right, above, col + 1),
+                                                   (down, left, below, col - 1),
+                                                   (down, right, below, col + 1)):
+        if not vertical and not horizontal:
+            corners += 1
+        elif vertical and horizontal and across[diagonal] != value:
+            corners += 1
+    return corners
+
+def label_regions(grid, first=0, last=None):
+    """
+    Labels the regions with union-find in a single raster scan. A cell takes
+    the label of a matching neighbour above or to the left, and joins the two
+    when both match, so area and perimeter are added to the root label as
+    the scan goes. Each cell brings four sides of fence, less two for every
+    matching neighbour above or to the left, since those sides are shared.
+    Sides are counted from cell_corners in the same pass.
+    Returns the cell labels, the union-find parents (pass a label through
+    find to get its region) and the regions by root label.
+    Given first and last, only rows first to last - 1 are labelled, as if
+    the rows outside were a different plant, except that sides are still
+    counted against the real rows either side. labels then starts at row
+    first.
+    """
+    cells, height, width = grid.cells, grid.height, grid.width
+    last = height if last is None else last
+    offset = first * width
+    labels = array('i', bytes(4 * (last - first) * width))
+    parent = array('i')
+    plants = bytearray()
+    area = array('q')
+    perimeter = array('q')
+    sides = array('q')
+
+    for row in range(first, last):
+        start = row * width
+        above = cells[start - width:start] if row else None
+        this = cells[start:start + width]
+        below = cells[start + width:start + 2 * width] if row < height - 1 else None
+        for i in range(start, start + width):
+            value = cells[i]
+            up = left = -1
+            if row > first and cells[i - width] == value:
+                up = find(parent, labels[i - width - offset])
+            if i != start and cells[i - 1] == value:
+                left = find(parent, labels[i - 1 - offset])
+
+            if up < 0 and left < 0:
+                label = len(parent)
+                parent.append(label)
+                plants.append(value)
+                area.append(0)
+                perimeter.append(0)
+                sides.append(0)
+            elif left < 0 or left == up:
+                label = up
+            elif up < 0:
+                label = left
+            else:
+                label = up
+                parent[left] = up
+                area[up] += area[left]
+                perimeter[up] += perimeter[left]
+                sides[up] += sides[left]
+
+            labels[i - offset] = label
+            area[label] += 1
+            perimeter[label] += 4 - 2 * ((up >= 0) + (left >= 0))
+            sides[label] += cell_corners(above, this, below, i - start)
+
+    regions = {}
+    for label in range(len(parent)):
+        if parent[label] == label:
+            regions[label] = Region(plants[label], area[label], perimeter[label], sides[label])
+    return labels, parent, regions
+
+def find_regions(grid):
+    return list(label_regions(grid)[2].values())
+
+def label_band(name, height, width, first, last):
+    """
+    Worker for find_regions_parallel: labels rows first to last - 1 of the
+    grid in the shared memory block called name. Returns the root labels
+    along the band's top and bottom rows, and its regions by root label.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    cells = shm.buf[:height * width]
+    try:
+        labels, parent, regions = label_regions(Grid(cells, height, width), first, last)
+    finally:
+        cells.release()
+        shm.close()
+    top = [find(parent, label) for label in labels[:width]]
+    bottom = [find(parent, label) for label in labels[-width:]]
+    return top, bottom, regions
+
+def find_regions_parallel(grid, workers=None):
+    """
+    find_regions with the rows split into one band per worker process. The
+    grid is copied into shared memory once, and each worker labels its own
+    band from there. Area, perimeter and sides are all sums over cells, so
+    the bands' regions only need merging where the same plant meets across
+    a band boundary, taking back the two sides of fence each band counted
+    for the shared edge.
+    """
+    height, width = grid.height, grid.width
+    workers = min(workers or os.cpu_count(), height)
+    if workers <= 1 or width == 0:
+        return find_regions(grid)
+    bounds = [height * k // workers for k in range(workers + 1)]
+
+    shm = shared_memory.SharedMemory(create=True, size=height * width)
+    try:
+        shm.buf[:height * width] = grid.cells
+        with ProcessPoolExecutor(workers) as pool:
+            bands = list(pool.map(label_band, repeat(shm.name), repeat(height), repeat(width),
+                                  bounds[:-1], bounds[1:]))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Band k's labels are offset by offsets[k] so they are unique overall
+    parent = {}
+    regions = {}
+    offsets = []
+    offset = 0
+    for _, _, band_regions in bands:
+        offsets.append(offset)
+        for label, region in band_regions.items():
+            parent[offset + label] = offset + label
+            regions[offset + label] = region
+        offset += max(band_regions) + 1
+
+    cells = grid.cells
+    for k in range(1, len(bands)):
+        start = bounds[k] * width
+        bottom = bands[k - 1][1]
+        top = bands[k][0]
+        for col in range(width):
+            if cells[start - width + col] != cells[start + col]:
+                continue
+            upper = find(parent, offsets[k - 1] + bottom[col])
+            lower = find(parent, offsets[k] + top[col])
+            regions[upper].perimeter -= 2
+            if lower != upper:
+                parent[lower] = upper
+                regions[upper].absorb(regions.pop(lower))
+    return list(regions.values())
+
+def label_rows(rows):
+    """
+    label_regions for an iterable of rows, holding only the rows either
+    side of the current one and the labels of the previous row, so memory
+    is O(width). Labels are renumbered to their roots after every row, and
+    a region is yielded as soon as none of its labels are in the row just
+    done, since then nothing below can touch it.
+    """
+    parent = {}
+    regions = {}
+    next_label = 0
+    above = above_labels = None
+    row = next(rows, None)
+
+    while row is not None:
+        below = next(rows, None)
+        if below is not None and len(below) != len(row):
+            raise ValueError(f'Row is {len(below)} wide, expected {len(row)}')
+
+        labels = [0] * len(row)
+        for col, value in enumerate(row):
+            up = left = -1
+            if above is not None and above[col] == value:
+                up = find(parent, above_labels[col])
+            if col and row[col - 1] == value:
+                left = find(parent, labels[col - 1])
+
+            if up < 0 and left < 0:
+                label = next_label
+                next_label += 1
+                parent[label] = label
+                regions[label] = Region(value)
+            elif left < 0 or left == up:
+                label = up
+            elif up < 0:
+                label = left
+            else:
+                label = up
+                parent[left] = up
+                regions[up].absorb(regions.pop(left))
+
+            region = regions[label]
+            region.area += 1
+            region.perimeter += 4 - 2 * ((up >= 0) + (left >= 0))
+            region.sides += cell_corners(above, row, below, col)
+            labels[col] = label
+
+        labels = [find(parent, label) for label in labels]
+        live = set(labels)
+        for label in regions.keys() - live:
+            yield regions.pop(label)
+        parent = {label: label for label in live}
+        above, above_labels, row = row, labels, below
+
+    yield from regions.values()
+
+def stream_regions(filename):
+    """
+    find_regions straight from the file, one row at a time.
+    """
+    with open(filename, 'rb') as f:
+        rows = (line.rstrip() for line in f)
+        yield from label_rows(row for row in rows if row)
+
+class Garden:
+    """
+    A plot map that can be replanted one cell at a time, keeping every
+    region's area, perimeter and sides, and the total prices, up to date.
+    labels[i] is the region of cell i directly, with no union-find.
+    Everything a cell adds to its region's stats depends only on the 3x3
+    block around it, so a replanted cell takes that block's share out of
+    its regions, relabels, and puts it back. Only joining regions and
+    splitting one visit more cells than that, and then only the cells of
+    the regions involved.
+    """
+    def __init__(self, grid):
+        self.grid = Grid(bytearray(grid.cells), grid.height, grid.width)
+        self.view = memoryview(self.grid.cells)
+        labels, parent, self.regions = label_regions(self.grid)
+        self.labels = array('i', (find(parent, label) for label in labels))
+        self.next_label = len(parent)
+        self.price = sum(region.price() for region in self.regions.values())
+        self.discount_price = sum(region.discount_price() for region in self.regions.values())
+
+    def __repr__(self):
+        return (f'Garden({self.grid.height}x{self.grid.width}, {len(self.regions)} regions, '
+                f'price={self.price}, discount_price={self.discount_price})')
+
+    def region_at(self, row, col):
+        return self.regions[self.labels[row * self.grid.width + col]]
+
+    def neighbours(self, i):
+        row, col = divmod(i, self.grid.width)
+        if row:
+            yield i - self.grid.width
+        if col:
+            yield i - 1
+        if col < self.grid.width - 1:
+            yield i + 1
+        if row < self.grid.height - 1:
+            yield i + self.grid.width
+
+    def block(self, i):
+        """
+        The cells in the 3x3 block around cell i, cut off at the edges.
+        """
+        row, col = divmod(i, self.grid.width)
+        return [r * self.grid.width + c
+                for r in range(max(row - 1, 0), min(row + 2, self.grid.height))
+                for c in range(max(col - 1, 0), min(col + 2, self.grid.width))]
+
+    def cell_stats(self, i):
+        """
+        What cell i adds to its region's perimeter and sides.
+        """
+        cells, width = self.view, self.grid.width
+        row, col = divmod(i, width)
+        start = row * width
+        above = cells[start - width:start] if row else None
+        below = cells[start + width:start + 2 * width] if row < self.grid.height - 1 else None
+        matches = sum(cells[j] == cells[i] for j in self.neighbours(i))
+        return 4 - matches, cell_corners(above, cells[start:start + width], below, col)
+
+    def add_cells(self, cells, sign):
+        for i in cells:
+            region = self.regions[self.labels[i]]
+            perimeter, sides = self.cell_stats(i)
+            region.area += sign
+            region.perimeter += sign * perimeter
+            region.sides += sign * sides
+
+    def add_prices(self, labels, sign):
+        for label in labels:
+            region = self.regions[label]
+            self.price += sign * region.price()
+            self.discount_price += sign * region.discount_price()
+
+    def flood(self, start, label, new_label=None):
+        """
+        The cells of region label connected to start, relabelled to
+        new_label if given.
+        """
+        labels = self.labels
+        seen = {start}
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            if new_label is not None:
+                labels[i] = new_label
+            for j in self.neighbours(i):
+                if j not in seen and labels[j] == label:
+                    seen.add(j)
+                    stack.append(j)
+        return seen
+
+    def set_cell(self, row, col, value):
+        """
+        Replants cell (row, col) with plant value, given as a character or
+        its byte value.
+        """
+        if not 0 <= row < self.grid.height:
+            raise IndexError(f'Row {row} is outside 0 to {self.grid.height - 1}')
+        if not 0 <= col < self.grid.width:
+            raise IndexError(f'Column {col} is outside 0 to {self.grid.width - 1}')
+        if isinstance(value, str):
+            value = ord(value)
+        cells, labels = self.grid.cells, self.labels
+        i = row * self.grid.width + col
+        old = cells[i]
+        if value == old:
+            return
+
+        block = self.block(i)
+        self.add_prices({labels[j] for j in block}, -1)
+        self.add_cells(block, -1)
+        old_label = labels[i]
+        cells[i] = value
+        labels[i] = -1
+
+        # Whatever the cell now touches with the same plant joins the
+        # biggest of those regions
+        joined = {labels[j] for j in self.neighbours(i) if cells[j] == value}
+        if joined:
+            label = max(joined, key=lambda label: self.regions[label].area)
+            for other in joined - {label}:
+                start = next(j for j in self.neighbours(i) if labels[j] == other)
+                self.flood(start, other, label)
+                self.regions[label].absorb(self.regions.pop(other))
+        else:
+            label = self.next_label
+            self.next_label += 1
+            self.regions[label] = Region(value)
+        labels[i] = label
+
+        # The cell may have been the only link between parts of its old
+        # region, which then each become a region of their own
+        left = [j for j in self.neighbours(i) if labels[j] == old_label]
+        if len(left) > 1:
+            reached = self.flood(left[0], old_label)
+            block_cells = set(block)
+            for start in left[1:]:
+                if start in reached:
+                    continue
+                new_label = self.next_label
+                self.next_label += 1
+                part = self.flood(start, old_label, new_label)
+                reached |= part
+                region = self.regions[new_label] = Region(old)
+                region.area = len(part - block_cells)
+                for j in part - block_cells:
+                    perimeter, sides = self.cell_stats(j)
+                    region.perimeter += perimeter
+                    region.sides += sides
+                old_region = self.regions[old_label]
+                old_region.area -= region.area
+                old_region.perimeter -= region.perimeter
+                old_region.sides -= region.sides
+
+        self.add_cells(block, 1)
+        if not left:
+            del self.regions[old_label]
+        self.add_prices({labels[j] for j in block}, 1)
@@ -1,4 +1,6 @@
+from array import array
 from enum import Enum
+from itertools import groupby
 
 class Direction(Enum):
     UP = 1
@@ -16,6 +18,15 @@ class Direction(Enum):
             Direction.NONE: '!'
         }[self]
 
+    def offset(self):
+        return {
+            Direction.UP: (-1, 0),
+            Direction.DOWN: (1, 0),
+            Direction.LEFT: (0, -1),
+            Direction.RIGHT: (0, 1),
+            Direction.NONE: (0, 0)
+        }[self]
+
 
 class Obj:
     def __init__(self, row, col, width, is_static):
@@ -39,15 +50,15 @@ class Obj:
             return set([(self.row, self.col + self.width)])
         return set([(self.row, self.col)])
 
-    def move(self):
+    def move(self, steps=1):
         if self.direction == Direction.UP:
-            self.row -= 1
+            self.row -= steps
         elif self.direction == Direction.DOWN:
-            self.row += 1
+            self.row += steps
         elif self.direction == Direction.LEFT:
-            self.col -= 1
+            self.col -= steps
         elif self.direction == Direction.RIGHT:
-            self.col += 1
+            self.col += steps
         self.direction = None
 
 
@@ -89,6 +100,28 @@ class Grid:
                 row[i] = '.'
 
 
+class Occupancy:
+    """
+    Which object, if any, is on each cell of the warehouse, so finding what a
+    raft runs into only means looking at the cells in front of it.
+    """
+    def __init__(self, height, width, objects=()):
+        self.cells = [[None for _ in range(width)] for _ in range(height)]
+        for obj in objects:
+            self.place(obj)
+
+    def at(self, row, col):
+        return self.cells[row][col]
+
+    def place(self, obj):
+        for row, col in obj.occupies():
+            self.cells[row][col] = obj
+
+    def remove(self, obj):
+        for row, col in obj.occupies():
+            self.cells[row][col] = None
+
+
 def read_input(filename):
     grid_height = 0
     grid_width = 0
@@ -146,32 +179,122 @@ def raft_moving_into(raft, direction):
     return wants - occupied
 
 
-def move_robot(robot, direction, objects):
+def find_raft(robot, direction, occupancy):
     """
-    Moves the robot and all its little boxes.
+    The robot plus every box it would push one step in direction, or None
+    if a wall is in the way.
     """
     raft = [robot]
-    resolved = False
-    can_move = False
-    while not resolved:
-        moving_into = raft_moving_into(raft, direction)
+    while True:
         obstacles = []
-        for obj in objects:
-            if moving_into.intersection(obj.occupies()):
-                obstacles.append(obj)
+        for row, col in raft_moving_into(raft, direction):
+            obj = occupancy.at(row, col)
+            if obj is None or obj in obstacles:
+                continue
+            if obj.is_static:
+                return None
+            obstacles.append(obj)
         if not obstacles:
-            can_move = True
-            resolved = True
-        else:
-            for obj in obstacles:
-                if obj.is_static:
-                    resolved = True
-                    can_move = False
-                else:
-                    raft.append(obj)
-    if can_move:
+            return raft
+        raft.extend(obstacles)
+
+
+def free_steps(raft, direction, occupancy, limit):
+    """
+    How many steps, up to limit, the raft can take in direction before its
+    wavefront reaches anything.
+    """
+    d_row, d_col = direction.offset()
+    wavefront = raft_moving_into(raft, direction)
+    steps = 0
+    while steps < limit and all(occupancy.at(row + d_row * steps, col + d_col * steps) is None
+                                for row, col in wavefront):
+        steps += 1
+    return steps
+
+
+def move_robot(robot, direction, occupancy, steps=1):
+    """
+    Moves the robot and all its little boxes steps times in direction, as
+    far as they go, looking up what is in the way in occupancy and keeping
+    it up to date. The raft only has to be found again when it runs into
+    something, so a long run of one direction moves it in a few big steps.
+    Returns how many steps were taken.
+    """
+    moved = 0
+    while moved < steps:
+        raft = find_raft(robot, direction, occupancy)
+        if raft is None:
+            break
+        free = free_steps(raft, direction, occupancy, steps - moved)
+
+        # Lift the whole raft first, so nothing is cleared after being placed
+        for obj in raft:
+            occupancy.remove(obj)
         for obj in raft:
-            obj.move()
+            obj.move(free)
+            occupancy.place(obj)
+        moved += free
+    return moved
+
+
+class Replay:
+    """
+    Plays the directions on the warehouse, saving a checkpoint every
+    interval moves: the robot's position then every box's, packed into an
+    array of ints. seek jumps to any move by restoring the nearest
+    checkpoint before it and replaying only the moves after that.
+    """
+    def __init__(self, robot, objects, height, width, directions, interval=1000):
+        self.robot = robot
+        self.objects = objects
+        self.boxes = [obj for obj in objects if isinstance(obj, Box)]
+        self.height = height
+        self.width = width
+        self.directions = directions
+        self.interval = interval
+        self.occupancy = Occupancy(height, width, objects)
+        self.position = 0
+        # checkpoints[k] is the state after k * interval moves
+        self.checkpoints = [self.snapshot()]
+
+    def snapshot(self):
+        positions = array('i', (self.robot.row, self.robot.col))
+        for box in self.boxes:
+            positions.extend((box.row, box.col))
+        return positions.tobytes()
+
+    def restore(self, snapshot):
+        positions = array('i')
+        positions.frombytes(snapshot)
+        for i, obj in enumerate([self.robot] + self.boxes):
+            obj.row, obj.col = positions[2 * i], positions[2 * i + 1]
+        self.occupancy = Occupancy(self.height, self.width, self.objects)
+
+    def run(self, stop):
+        """
+        Plays on from the current move to move stop. Runs of one direction
+        are batched, but split at checkpoints so each one can be saved.
+        """
+        while self.position < stop:
+            end = min(stop, (self.position // self.interval + 1) * self.interval)
+            for direction, run in groupby(self.directions[self.position:end]):
+                move_robot(self.robot, direction, self.occupancy, sum(1 for _ in run))
+            self.position = end
+            if end == len(self.checkpoints) * self.interval:
+                self.checkpoints.append(self.snapshot())
+
+    def seek(self, move):
+        """
+        Puts the warehouse in its state after the first move directions.
+        """
+        if not 0 <= move <= len(self.directions):
+            raise IndexError(f'Move {move} is outside 0 to {len(self.directions)}')
+        k = min(move // self.interval, len(self.checkpoints) - 1)
+        if not k * self.interval <= self.position <= move:
+            self.restore(self.checkpoints[k])
+            self.position = k * self.interval
+        self.run(move)
 
 
 def score(objects):
@@ -184,7 +307,8 @@ def score(objects):
 robot, objects, height, width, directions = read_input('input.txt')
 grid = Grid(height, width)
 grid.draw(objects)
-for direction in directions:
-    move_robot(robot, direction, objects)
-    # grid.draw(objects)
+replay = Replay(robot, objects, height, width, directions)
+replay.run(len(directions))
+# replay.seek(15000)
+# grid.draw(objects)
 print(score(objects))
@@ -1,37 +1,21 @@
-from collections import defaultdict
+import rules
+from rules import check_seqs
 
-def construct_d(filename):
-    d = defaultdict(set)
-    with open(filename) as fl:
-        lines = [l.strip() for l in fl.readlines() if '|' in l]
-    for line in lines:
-        a, b = (int(n) for n in line.split('|'))
-        d[a].add(b)
-    return d
+def sum_chunk(seqs, d, matrix, cache):
+    if matrix is not None:
+        valid = check_seqs(seqs, matrix)
+    else:
+        valid = [cache.check(seq) for seq in seqs]
+    return sum(seq[len(seq) // 2] for seq, ok in zip(seqs, valid) if ok)
 
-def get_seqs(filename):
-    with open(filename) as fl:
-        lines = [l.strip() for l in fl.readlines() if l.strip() and '|' not in l]
-    seqs = [[int(a) for a in b.split(',')] for b in lines]
-    return seqs
-
-def check_seq(seq, d):
-    for i in range(len(seq)-1, 0, -1):
-        char = seq[i]
-        # print(f'i: {i}, char: {char}, seq[:i]: {seq[:i]}')
-        for preceding in seq[:i]:
-            if preceding in d[char]:
-                return False
-    return True
+def solve(filename, workers=None, chunk_size=10000, cache_size=4096):
+    return rules.solve(filename, sum_chunk, workers, chunk_size, cache_size)
 
 def main():
-    d = construct_d('input.txt')
-    seqs = get_seqs('input.txt')
-    total = 0
-    for seq in seqs:
-        if check_seq(seq, d):
-            total += seq[len(seq) // 2]
+    total, stats = solve('input.txt')
     print(total)
+    print(f'Ordering cache: {stats["hits"]} hits, {stats["misses"]} misses, '
+          f'{stats["evictions"]} evictions')
 
 if __name__ == '__main__':
     main()
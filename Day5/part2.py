@@ -1,50 +1,26 @@
-from collections import defaultdict
-
-def construct_d(filename):
-    d = defaultdict(set)
-    with open(filename) as fl:
-        lines = [l.strip() for l in fl.readlines() if '|' in l]
-    for line in lines:
-        a, b = (int(n) for n in line.split('|'))
-        d[a].add(b)
-    return d
-
-def get_seqs(filename):
-    with open(filename) as fl:
-        lines = [l.strip() for l in fl.readlines() if l.strip() and '|' not in l]
-    seqs = [[int(a) for a in b.split(',')] for b in lines]
-    return seqs
-
-def check_seq(seq, d):
-    for i in range(len(seq)-1, 0, -1):
-        char = seq[i]
-        # print(f'i: {i}, char: {char}, seq[:i]: {seq[:i]}')
-        for preceding in seq[:i]:
-            if preceding in d[char]:
-                return False
-    return True
-
-
-def pair_in_wrong_order(char_left, char_right, d):
-    return char_left in d[char_right]
+import rules
+from rules import check_seqs
+
+def sum_chunk(seqs, d, matrix, cache):
+    if matrix is not None:
+        valid = check_seqs(seqs, matrix)
+    else:
+        valid = [cache.check(seq) for seq in seqs]
+    total = 0
+    for seq, ok in zip(seqs, valid):
+        if not ok:
+            seq = cache.order(seq)
+            total += seq[len(seq) // 2]
+    return total
 
-def bubble_sort(seq, d):
-    for i in range(len(seq)-1):
-        for j in range(i + 1, len(seq)):
-            if pair_in_wrong_order(seq[i], seq[j], d):
-                seq[i], seq[j] = seq[j], seq[i]
-                return bubble_sort(seq, d)
-    return seq
+def solve(filename, workers=None, chunk_size=10000, cache_size=4096):
+    return rules.solve(filename, sum_chunk, workers, chunk_size, cache_size)
 
 def main():
-    d = construct_d('input.txt')
-    seqs = [seq for seq in get_seqs('input.txt') if not check_seq(seq, d)]
-    total = 0
-    for seq in seqs:
-        seq = bubble_sort(seq, d)
-        if check_seq(seq, d):
-            total += seq[len(seq) // 2]
+    total, stats = solve('input.txt')
     print(total)
+    print(f'Ordering cache: {stats["hits"]} hits, {stats["misses"]} misses, '
+          f'{stats["evictions"]} evictions')
 
 if __name__ == '__main__':
     main()
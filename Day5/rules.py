@@ -0,0 +1,250 @@
+import os
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def read_rules(fl):
+    """
+    Reads the rules from the top of an open input file. Returns them with an
+    iterator over the rest of the lines, which starts at the first update
+    whether or not a blank line separates the two.
+    """
+    d = defaultdict(set)
+    for line in fl:
+        if '|' in line:
+            a, b = (int(n) for n in line.split('|'))
+            d[a].add(b)
+        elif line.strip():
+            return d, chain([line], fl)
+    return d, iter(())
+
+def read_chunks(lines, chunk_size):
+    """
+    Yields the updates in lines, chunk_size at a time.
+    """
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append([int(a) for a in line.split(',')])
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def construct_d(filename):
+    with open(filename) as fl:
+        return read_rules(fl)[0]
+
+def get_seqs(filename):
+    with open(filename) as fl:
+        lines = read_rules(fl)[1]
+        return [seq for chunk in read_chunks(lines, 10000) for seq in chunk]
+
+def check_seq(seq, d):
+    for i in range(len(seq)-1, 0, -1):
+        char = seq[i]
+        # print(f'i: {i}, char: {char}, seq[:i]: {seq[:i]}')
+        for preceding in seq[:i]:
+            if preceding in d[char]:
+                return False
+    return True
+
+def construct_matrix(d):
+    """
+    Dense version of the rules: matrix[a, b] is True when a must come before b.
+    The last row and column belong to no page and are used as padding.
+    """
+    pages = set(d).union(*d.values())
+    size = max(pages, default=0) + 2
+    matrix = np.zeros((size, size), dtype=bool)
+    for a, bs in d.items():
+        for b in bs:
+            matrix[a, b] = True
+    return matrix
+
+def check_seqs(seqs, matrix):
+    """
+    Vectorized check_seq over every update at once. The ragged updates are
+    padded into a 2-D array, then each column is tested against all the
+    columns before it. Returns a boolean array, one entry per update.
+    """
+    pad = len(matrix) - 1
+    width = max((len(seq) for seq in seqs), default=0)
+    padded = np.full((len(seqs), width), pad, dtype=np.intp)
+    for i, seq in enumerate(seqs):
+        padded[i, :len(seq)] = seq
+    # Pages that have no rules at all behave exactly like padding
+    padded[padded > pad] = pad
+
+    valid = np.ones(len(seqs), dtype=bool)
+    for j in range(1, width):
+        valid &= ~matrix[padded[:, j, None], padded[:, :j]].any(axis=1)
+    return valid
+
+def topological_sort(seq, d):
+    """
+    Orders seq using only the rules between pages that appear in it
+    (Kahn's algorithm), so it costs O(k + rules) rather than re-scanning
+    the whole update after every swap.
+    Raises ValueError if the rules restricted to seq contain a cycle.
+    """
+    pages = set(seq)
+    indegree = {page: 0 for page in seq}
+    for page in indegree:
+        for after in d[page] & pages:
+            indegree[after] += 1
+
+    queue = deque(page for page in indegree if indegree[page] == 0)
+    ordered = []
+    while queue:
+        page = queue.popleft()
+        ordered.append(page)
+        for after in d[page] & pages:
+            indegree[after] -= 1
+            if indegree[after] == 0:
+                queue.append(after)
+
+    if len(ordered) < len(indegree):
+        stuck = sorted(page for page in indegree if indegree[page] > 0)
+        raise ValueError(f'Rules for pages {stuck} contain a cycle')
+    return ordered
+
+class OrderingCache:
+    """
+    LRU cache keyed by the set of pages in an update, because the same sets
+    of pages turn up again and again. Each entry holds the rules between
+    the pages in the set, which is all check needs, and once order has been
+    asked for, the rank of each page in a correct ordering of the set.
+    hits, misses and evictions count lookups for both.
+    """
+    def __init__(self, d, maxsize=4096):
+        self.d = d
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (f'OrderingCache(size={len(self.entries)}, hits={self.hits}, '
+                f'misses={self.misses}, evictions={self.evictions})')
+
+    def stats(self):
+        return Counter(hits=self.hits, misses=self.misses, evictions=self.evictions)
+
+    def entry(self, seq):
+        """
+        [pages each page must come before, ranks or None] for seq's pages.
+        """
+        key = frozenset(seq)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = [{page: self.d[page] & key for page in key}, None]
+        self.entries[key] = entry
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def check(self, seq):
+        """
+        Same answer as check_seq: no page may come after one it must
+        come before.
+        """
+        after = self.entry(seq)[0]
+        seen = set()
+        for page in seq:
+            if not after[page].isdisjoint(seen):
+                return False
+            seen.add(page)
+        return True
+
+    def order(self, seq):
+        """
+        seq in a correct order. Where the rules leave pages unordered, every
+        update with the same pages is ordered the same way, as
+        topological_sort of the pages in ascending order would, so the
+        answer doesn't depend on which update filled the cache.
+        """
+        entry = self.entry(seq)
+        if entry[1] is None:
+            ordered = topological_sort(sorted(set(seq)), self.d)
+            entry[1] = {page: i for i, page in enumerate(ordered)}
+        return sorted(seq, key=entry[1].__getitem__)
+
+# Per-process state, set up once by init_worker rather than pickled per chunk
+_rules = None
+_matrix = None
+_cache = None
+
+def init_worker(d, cache_size=4096):
+    global _rules, _matrix, _cache
+    _rules = d
+    _matrix = construct_matrix(d) if np is not None else None
+    _cache = OrderingCache(d, cache_size)
+
+def run_chunk(sum_chunk, seqs):
+    """
+    sum_chunk over seqs in this process, with what it did to the cache.
+    """
+    before = _cache.stats()
+    total = sum_chunk(seqs, _rules, _matrix, _cache)
+    return total, _cache.stats() - before
+
+def add_results(results):
+    total = 0
+    stats = Counter()
+    for chunk_total, chunk_stats in results:
+        total += chunk_total
+        stats += chunk_stats
+    return total, stats
+
+def bounded_map(pool, fn, iterable, limit):
+    """
+    Like pool.map, but keeps at most limit tasks in flight so that the
+    iterable is consumed lazily. Results come back in completion order.
+    """
+    pending = set()
+    for item in iterable:
+        if len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(pool.submit(fn, item))
+    for future in wait(pending).done:
+        yield future.result()
+
+def solve(filename, sum_chunk, workers=None, chunk_size=10000, cache_size=4096):
+    """
+    Reads filename once, sending the updates to a process pool in chunks so
+    memory stays flat however many updates there are, and adds up
+    sum_chunk(seqs, d, matrix, cache) over the chunks. matrix is None
+    without numpy. Every process has its own OrderingCache of cache_size
+    entries, and their hits, misses and evictions are added up too.
+    Returns the total and a Counter of the cache stats.
+    workers=1 does all the work in this process instead.
+    """
+    workers = workers or os.cpu_count()
+    task = partial(run_chunk, sum_chunk)
+    with open(filename) as fl:
+        d, lines = read_rules(fl)
+        chunks = read_chunks(lines, chunk_size)
+        if workers == 1:
+            init_worker(d, cache_size)
+            return add_results(map(task, chunks))
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(d, cache_size)) as pool:
+            return add_results(bounded_map(pool, task, chunks, 2 * workers))
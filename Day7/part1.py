@@ -1,9 +1,13 @@
-import functools
+from solver import ADD, MUL, powers_of_ten, prefix_bounds, solve_reverse
+
+OPERATORS = (MUL, ADD)
 
 class Problem:
     def __init__(self, target_string, component_string):
         self.target = int(target_string)
         self.components = tuple(int(x) for x in component_string.strip().split())
+        self.powers = powers_of_ten(self.components)
+        self.bounds = prefix_bounds(self.components, self.powers, OPERATORS)
 
     def __repr__(self):
         return f'Problem({self.target}, {self.components})'
@@ -15,35 +19,7 @@ class Problem:
         return sum(self.components) == self.target
 
     def solve(self):
-        return solve(self.target, self.components[1:], self.components[0], '')
-
-@functools.cache
-def solve(target, components, accumulator, operations):
-    # print(target, components, accumulator, operations)
-    if len(components) == 0:
-        return accumulator == target, accumulator, operations
-
-    if accumulator > target:
-        return False, accumulator, 'exceed'
-    
-    prod_arm = solve(target,
-                 components[1:],
-                 accumulator * components[0],
-                 operations + '*')
-    
-    sum_arm = solve(target,
-                 components[1:],
-                 accumulator + components[0],
-                 operations + '+')
-
-    if prod_arm[0]:
-        return prod_arm 
-
-    if sum_arm[0]:
-        return sum_arm
-
-    return False, accumulator, 'fail'
-        
+        return solve_reverse(self.target, self.components, OPERATORS, self.powers, self.bounds)
 
 def read_input(filename):
     problems = []
@@ -60,10 +36,8 @@ def main():
     for prob in problems:
         if prob.simple_solve():
             acc += prob.target
-        else:
-            soln = prob.solve()
-            if soln[0]:
-                acc += prob.target
+        elif prob.solve():
+            acc += prob.target
     print(f'Part 1: {acc}')
     return acc
 
@@ -1,56 +1,25 @@
-from math import log10
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from solver import ADD, CONCAT, MUL, powers_of_ten, prefix_bounds, solve_frontier, solve_reverse
+
+OPERATORS = (MUL, CONCAT, ADD)
 
 class Problem:
     def __init__(self, target_string, component_string):
         self.target = int(target_string)
         self.components = tuple(int(x) for x in component_string.strip().split())
+        self.powers = powers_of_ten(self.components)
+        self.bounds = prefix_bounds(self.components, self.powers, OPERATORS)
 
     def __repr__(self):
         return f'Problem({self.target}, {self.components})'
 
-def digits(n):
-    return int(log10(n)) + 1
-
-def numerical_endswith(a, b):
-    return (a - b) % (10 ** digits(b)) == 0
-
-def numerical_unconcat(a, b):
-    return a // (10 ** digits(b))
-
-def solve_reverse(target, components):
-    def inner(index, accumulator):
-        value = components[index]
-
-        if index == 0:
-            return accumulator == value
-
-        mult_test = accumulator % value == 0
-        concat_test = numerical_endswith(accumulator, value)
-
-        if mult_test and inner(index - 1, accumulator // value):
-            return True
-
-        if concat_test and inner(index - 1, numerical_unconcat(accumulator, value)):
-            return True
-
-        return inner(index - 1, accumulator - value)
-    return inner(len(components) - 1, target)
+    def solve(self):
+        return solve_reverse(self.target, self.components, OPERATORS, self.powers, self.bounds)
 
 def solve(target, components):
-    def inner(index, accumulator):
-        if accumulator > target:
-            return False
-        
-        if index == l:
-            return accumulator == target
-
-        return inner(index + 1, accumulator * components[index]) or \
-            inner(index + 1, accumulator + components[index]) or \
-            inner(index + 1, int(str(accumulator) + str_components[index]))
-
-    l = len(components)
-    str_components = [str(x) for x in components]
-    return inner(1, components[0])
+    return solve_frontier(target, components, OPERATORS)
 
 def read_input(filename):
     problems = []
@@ -60,13 +29,32 @@ def read_input(filename):
             problems.append(Problem(target, components))
     return problems
 
-def main():
+def timed_solve(prob):
+    start = time.perf_counter()
+    solved = prob.solve()
+    return prob.target if solved else 0, time.perf_counter() - start
+
+def solve_batch(problems, workers=None, chunk_size=1000):
+    """
+    Splits the problems across a process pool, chunk_size at a time.
+    Returns the sum of the solvable targets and the time each problem took,
+    both in the same order as problems.
+    """
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(timed_solve, problems, chunksize=chunk_size))
+    acc = sum(target for target, _ in results)
+    timings = [elapsed for _, elapsed in results]
+    return acc, timings
+
+def report_slowest(problems, timings, n=5):
+    slowest = sorted(range(len(problems)), key=timings.__getitem__, reverse=True)[:n]
+    for i in slowest:
+        print(f'{timings[i] * 1000:8.2f} ms  line {i + 1}: {problems[i]}')
+
+def main(workers=None, chunk_size=1000):
     problems = read_input('input.txt')
-
-    acc = 0
-    for prob in problems:
-        if solve_reverse(prob.target, prob.components):
-            acc += prob.target
+    acc, timings = solve_batch(problems, workers, chunk_size)
+    report_slowest(problems, timings)
     return acc
 
 if __name__ == '__main__':
@@ -0,0 +1,192 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Operator:
+    """
+    A binary operator that the reverse solver knows how to undo.
+    If apply(x, b, power) == a then inverse(a, b, power) == x, and
+    applies(a, b, power) says whether there is any such x at all.
+    power is 10 ** digits(b), looked up from the problem's table so that the
+    concatenation functions never have to work it out in the inner loop.
+    """
+    def __init__(self, symbol, apply, inverse, applies):
+        self.symbol = symbol
+        self.apply = apply
+        self.inverse = inverse
+        self.applies = applies
+
+    def __repr__(self):
+        return f'Operator({self.symbol})'
+
+def digits(n):
+    # Exact for ints of any size, unlike int(log10(n)) + 1
+    return len(str(n))
+
+def add(a, b, power):
+    return a + b
+
+def subtract(a, b, power):
+    return a - b
+
+def can_subtract(a, b, power):
+    return a >= b
+
+def multiply(a, b, power):
+    return a * b
+
+def divide(a, b, power):
+    return a // b
+
+def can_divide(a, b, power):
+    return b != 0 and a % b == 0
+
+def concat(a, b, power):
+    return a * power + b
+
+def numerical_unconcat(a, b, power):
+    return a // power
+
+def numerical_endswith(a, b, power):
+    return (a - b) % power == 0
+
+ADD = Operator('+', add, subtract, can_subtract)
+MUL = Operator('*', multiply, divide, can_divide)
+CONCAT = Operator('||', concat, numerical_unconcat, numerical_endswith)
+
+def powers_of_ten(components):
+    return tuple(10 ** digits(value) for value in components)
+
+def prefix_bounds(components, powers, operators):
+    """
+    lows[i] and highs[i] bound every value components[:i + 1] can reach.
+    Every operator is non-decreasing in the accumulator, so applying each
+    one to the previous bound gives the new bound.
+    """
+    lows = [components[0]]
+    highs = [components[0]]
+    for value, power in zip(components[1:], powers[1:]):
+        lows.append(min(op.apply(lows[-1], value, power) for op in operators))
+        highs.append(max(op.apply(highs[-1], value, power) for op in operators))
+    return tuple(lows), tuple(highs)
+
+# Equations at least this long go to solve_meet_in_the_middle
+MEET_IN_THE_MIDDLE_THRESHOLD = 25
+
+# Longer equations than this make solve_frontier fall back to solve_reverse
+FRONTIER_THRESHOLD = 12
+
+INT64_MAX = 2 ** 63 - 1
+
+def solve_reverse(target, components, operators, powers=None, bounds=None):
+    """
+    Works backwards from the target, undoing the last component with each
+    operator that could have produced the accumulator. The inverses prune
+    most branches straight away, and nothing is cached, so memory only grows
+    with the recursion depth.
+    Long equations, where the pruning can still leave an exponential search,
+    are handed to solve_meet_in_the_middle instead.
+    powers and bounds come from powers_of_ten and prefix_bounds, and are
+    worked out here if the caller hasn't precomputed them.
+    """
+    if powers is None:
+        powers = powers_of_ten(components)
+    if bounds is None:
+        bounds = prefix_bounds(components, powers, operators)
+
+    if len(components) >= MEET_IN_THE_MIDDLE_THRESHOLD:
+        return solve_meet_in_the_middle(target, components, operators, powers, bounds)
+
+    lows, highs = bounds
+
+    def inner(index, accumulator):
+        if accumulator < lows[index] or accumulator > highs[index]:
+            return False
+
+        if index == 0:
+            return True
+
+        value = components[index]
+        power = powers[index]
+        for op in operators:
+            if op.applies(accumulator, value, power) and \
+                    inner(index - 1, op.inverse(accumulator, value, power)):
+                return True
+        return False
+    return inner(len(components) - 1, target)
+
+def solve_meet_in_the_middle(target, components, operators, powers=None, bounds=None):
+    """
+    Grows the set of values reachable from the left end of the components
+    and the set of accumulators the right end can be undone to from the
+    target, always extending whichever set is smaller, until the two sides
+    cover every component. The equation holds if the sets then meet.
+    This assumes no operator ever makes the accumulator smaller, so forward
+    values above the target are dropped, and backward values outside the
+    prefix_bounds of what is left are dropped too.
+    """
+    if powers is None:
+        powers = powers_of_ten(components)
+    if bounds is None:
+        bounds = prefix_bounds(components, powers, operators)
+    lows, highs = bounds
+
+    left, right = 1, len(components)
+    forward = {components[0]}
+    backward = {target}
+
+    while left < right:
+        if len(forward) <= len(backward):
+            value = components[left]
+            power = powers[left]
+            forward = {op.apply(a, value, power) for a in forward for op in operators}
+            forward = {a for a in forward if a <= target}
+            left += 1
+        else:
+            right -= 1
+            value = components[right]
+            power = powers[right]
+            low, high = lows[right - 1], highs[right - 1]
+            backward = {op.inverse(a, value, power)
+                        for a in backward
+                        for op in operators
+                        if op.applies(a, value, power)}
+            backward = {a for a in backward if low <= a <= high}
+        if not forward or not backward:
+            return False
+
+    return not forward.isdisjoint(backward)
+
+def fits_int64(target, components, powers):
+    """
+    Whether solve_frontier can run without overflowing. It never keeps a
+    value above the target, so the largest thing it computes is one
+    operator applied to the target.
+    """
+    if np is None:
+        return False
+    largest = max(max(components), max(powers))
+    return target * largest + largest <= INT64_MAX
+
+def solve_frontier(target, components, operators, powers=None):
+    """
+    Breadth-first version of the forward search, holding every accumulator
+    value for the components so far in one int64 array. Each operator is
+    applied to the whole array at once, values above the target are
+    dropped, and duplicates are merged.
+    Equations longer than FRONTIER_THRESHOLD, whose frontier could get too
+    big, or whose values might overflow an int64 go to solve_reverse.
+    """
+    if powers is None:
+        powers = powers_of_ten(components)
+    if len(components) > FRONTIER_THRESHOLD or not fits_int64(target, components, powers):
+        return solve_reverse(target, components, operators, powers)
+
+    frontier = np.array([components[0]], dtype=np.int64)
+    for value, power in zip(components[1:], powers[1:]):
+        frontier = np.concatenate([op.apply(frontier, value, power) for op in operators])
+        frontier = np.unique(frontier[frontier <= target])
+        if len(frontier) == 0:
+            return False
+    return bool((frontier == target).any())
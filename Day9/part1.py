@@ -1,120 +1,217 @@
+import mmap
+import os
 import sys
+from array import array
+from heapq import heappop, heappush
 
-class Block:
-    def __init__(self, label, reps, is_gap=False):
-        self.label = label
-        self.reps = reps
-        self.is_gap = is_gap
+GAP = -1
+
+class DiskMap:
+    """
+    Structure-of-arrays disk map: run i starts at starts[i], is lengths[i]
+    blocks long and holds file labels[i], or GAP for free space. Anywhere
+    no run covers is free space too, so the compacted maps below only keep
+    their file runs.
+    """
+    __slots__ = ('starts', 'lengths', 'labels')
+
+    def __init__(self):
+        self.starts = array('q')
+        self.lengths = array('b')
+        self.labels = array('i')
 
     def __repr__(self):
-        return f'({self.label}, {self.reps})'
+        return f'DiskMap({len(self)} runs)'
+
+    def __len__(self):
+        return len(self.labels)
+
+    def append(self, start, length, label):
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.labels.append(label)
+
+    def runs(self):
+        return zip(self.starts, self.lengths, self.labels)
 
 
 def blocklist(s):
-    blocks = []
-    label = 0
+    disk = DiskMap()
+    position = 0
     for i, char in enumerate(s):
-        if i&1:
-            block = Block('.', int(char), True)
+        length = int(char)
+        disk.append(position, length, GAP if i & 1 else i // 2)
+        position += length
+    return disk
+
+def to_string(disk):
+    parts = []
+    position = 0
+    for start, length, label in sorted(disk.runs()):
+        if label == GAP:
+            continue
+        parts.append('.' * (start - position))
+        parts.append(str(label) * length)
+        position = start + length
+    return ''.join(parts)
+
+def run_sum(position, reps):
+    """
+    Sum of position, position + 1, ..., position + reps - 1.
+    """
+    return reps * position + reps * (reps - 1) // 2
+
+def move(disk):
+    """
+    Part 1's compaction: fills the gaps from the left with blocks taken
+    from the rightmost files. One pointer walks forwards through the runs
+    and the other walks backwards through the files, so every run is
+    visited once. Returns a new DiskMap of file runs in position order.
+    """
+    starts, lengths, labels = disk.starts, disk.lengths, disk.labels
+    compacted = DiskMap()
+    left = 0
+    right = len(disk) - 1
+    while right >= 0 and labels[right] == GAP:
+        right -= 1
+    remaining = lengths[right] if right >= 0 else 0
+    position = starts[0] if len(disk) else 0
+
+    while left < right:
+        if labels[left] != GAP:
+            compacted.append(position, lengths[left], labels[left])
+            position += lengths[left]
         else:
-            block = Block(label, int(char), False)
-            label += 1
-        blocks.append(block)
-    return blocks
-
-def first_empty(blocklist):
-    for i, block in enumerate(blocklist):
-        if block.is_gap and block.reps > 0:
-            return i
-    return -1
-
-def last_full(blocklist):
-    for i, block in enumerate(reversed(blocklist)):
-        if not block.is_gap:
-            if block.reps == 0: raise ValueError('Non-gaps should have a length>0')
-            return len(blocklist) - i - 1
-    return -1
-
-def to_string(blocklist):
-    s = ''
-    for block in blocklist:
-        s += str(block.label) * block.reps
-    return s
-
-def first_empty_with_size(blocklist, size):
-    for i, block in enumerate(blocklist):
-        if block.is_gap and block.reps >= size:
-            return i
-    return -1
-
-def last_full_descending(blocklist, file_id):
-    for i, block in enumerate(reversed(blocklist)):
-        if not block.is_gap:
-            if block.label <= file_id:
-                return len(blocklist) - i - 1
-    return -1
-
-def move_contiguous(blocklist, file_id):
-    l = last_full_descending(blocklist, file_id)
-    f = first_empty_with_size(blocklist, blocklist[l].reps)
-    if f != -1 and f < l:
-        blocklist[f].reps -= blocklist[l].reps
-        file_block = blocklist[l]
-        blocklist[l] = Block('.', file_block.reps, True)
-        blocklist = blocklist[:f] + [Block('.', 0, True)] + [file_block] + blocklist[f:]
-        file_id = file_block.label
-    return blocklist, file_id - 1
-
-
-def move(blocklist):
-    f = first_empty(blocklist)
-    l = last_full(blocklist)
-    lb = blocklist[l]
-    if f == -1 or l == -1:
-        return blocklist
-    if f > l:
-        print('Unexpected')
-        return blocklist
-    blocklist[f].reps -= 1
-    blocklist[l].reps -= 1
-    if blocklist[l].reps == 0:
-        blocklist = blocklist[:l]
-        while blocklist[-1].is_gap:
-            blocklist.pop()
-    if blocklist[f-1].label != lb.label:
-        blocklist = blocklist[:f] + [Block('.', 0, True), Block(lb.label, 1, False)] + blocklist[f:]
-    else:
-        blocklist[f-1].reps += 1
-    return blocklist
-
-def checksum(blocklist):
-    s = 0
-    p = 0
-    for block in blocklist:
-        if block.is_gap:
-            p += block.reps
+            gap = lengths[left]
+            while gap > 0 and left < right:
+                reps = min(gap, remaining)
+                if reps:
+                    compacted.append(position, reps, labels[right])
+                position += reps
+                gap -= reps
+                remaining -= reps
+                if remaining == 0:
+                    right -= 1
+                    while right > left and labels[right] == GAP:
+                        right -= 1
+                    remaining = lengths[right]
+        left += 1
+
+    if left == right and labels[right] != GAP and remaining:
+        compacted.append(position, remaining, labels[right])
+    return compacted
+
+def move_contiguous(disk):
+    """
+    Part 2's compaction: moves each whole file, highest label first, into
+    the leftmost gap that fits it, as long as that is further left. Gaps are
+    indexed with one min-heap of start positions per size from 1 to 9, so
+    the leftmost fit is the smallest of at most nine heap tops. Files only
+    move left, so the space a file leaves is never wanted by a later one.
+    blocklist labels files in ascending order, so the files are taken
+    straight from the runs, last first.
+    Returns a new DiskMap of file runs, highest label first.
+    """
+    gaps = [[] for _ in range(10)]
+    for start, length, label in disk.runs():
+        if label == GAP and length > 0:
+            gaps[length].append(start)  # ascending, so already a heap
+
+    moved = DiskMap()
+    for i in range(len(disk) - 1, -1, -1):
+        if disk.labels[i] == GAP:
+            continue
+        start, length = disk.starts[i], disk.lengths[i]
+        best = None
+        for size in range(max(length, 1), 10):
+            heap = gaps[size]
+            if heap and heap[0] < start and (best is None or heap[0] < gaps[best][0]):
+                best = size
+        if best is not None:
+            start = heappop(gaps[best])
+            if best > length:
+                heappush(gaps[best - length], start + length)
+        moved.append(start, length, disk.labels[i])
+    return moved
+
+def checksum(disk):
+    return sum(label * run_sum(start, length)
+               for start, length, label in disk.runs()
+               if label != GAP)
+
+def runs_forwards(mm, end, chunk_size):
+    """
+    Yields (index, length) for every run in mm[:end], chunk_size bytes at a time.
+    """
+    for offset in range(0, end, chunk_size):
+        chunk = mm[offset:min(offset + chunk_size, end)]
+        for i, byte in enumerate(chunk, offset):
+            yield i, byte - ord('0')
+
+def files_backwards(mm, end, chunk_size):
+    """
+    Yields (index, length) for the file runs in mm[:end], last first.
+    """
+    for stop in range(end, 0, -chunk_size):
+        begin = max(stop - chunk_size, 0)
+        chunk = mm[begin:stop]
+        for i in range(stop - 1, begin - 1, -1):
+            if i & 1 == 0:
+                yield i, chunk[i - begin] - ord('0')
+
+def pointer_checksum(forwards, backwards):
+    """
+    move()'s two-pointer walk, summing the checksum as it goes instead of
+    building a DiskMap. forwards yields (index, length) for every run in
+    order, and backwards does the same for the file runs, last first.
+    """
+    left, length = next(forwards)
+    right, remaining = next(backwards)
+    position = 0
+    total = 0
+
+    while left < right:
+        if left & 1 == 0:
+            total += (left // 2) * run_sum(position, length)
+            position += length
         else:
-            for _ in range(block.reps):
-                s += p * block.label
-                p += 1
-    return s
+            gap = length
+            while gap > 0 and left < right:
+                reps = min(gap, remaining)
+                total += (right // 2) * run_sum(position, reps)
+                position += reps
+                gap -= reps
+                remaining -= reps
+                if remaining == 0:
+                    right, remaining = next(backwards)
+        left, length = next(forwards)
+
+    if left == right:
+        total += (right // 2) * run_sum(position, remaining)
+    return total
+
+def stream_checksum(filename, chunk_size=1 << 20):
+    """
+    Same answer as checksum(move(blocklist(s))), but reads the disk map
+    through mmap from both ends in chunks, so memory stays flat however big
+    the map is.
+    """
+    with open(filename, 'rb') as fl:
+        if os.fstat(fl.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm)
+            while end > 0 and not chr(mm[end - 1]).isdigit():
+                end -= 1
+            if end == 0:
+                return 0
+            return pointer_checksum(runs_forwards(mm, end, chunk_size),
+                                    files_backwards(mm, end, chunk_size))
 
 
 # Part 1
-s = open('input.txt').read().strip()
-blocks = blocklist(s)
-moves = 0
-while first_empty(blocks) != -1:
-    blocks = move(blocks)
-    moves += 1
-print(moves)
-print(checksum(blocks))
+print(stream_checksum('input.txt'))
 
 # Part 2
 s = open('input.txt').read().strip()
-blocks = blocklist(s)
-m = blocks[-1].label
-while m >= 0:
-    blocks, m = move_contiguous(blocks, m)
-    # print(to_string(blocks))
-print(checksum(blocks))
+print(checksum(move_contiguous(blocklist(s))))